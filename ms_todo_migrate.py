@@ -13,40 +13,286 @@ Usage: see README.md or run with -h
 from __future__ import annotations
 
 import argparse
-import json
 import os
+import random
 import re
 import sys
-from typing import Dict, Iterable, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, urlencode
 
+import orjson
 import requests
+import requests.exceptions
 import yaml
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+try:
+    # libyaml's C emitter is considerably faster than the pure-Python one
+    from yaml import CSafeDumper as _YAML_DUMPER
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _YAML_DUMPER  # type: ignore[assignment]
+
+try:
+    # Only needed when the module is compiled with mypyc (see README)
+    from mypy_extensions import mypyc_attr
+except ImportError:
+    def mypyc_attr(*attrs: str, **kwattrs: object):  # type: ignore[misc]
+        return lambda cls: cls
+
+# Transient Graph responses (throttling / gateway hiccups) that are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Network failures worth retrying, including a connection dropped while reading the body
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+GRAPH_API = "https://graph.microsoft.com/v1.0"
+# JSON batching: up to 20 GET sub-requests per POST to $batch
+BATCH_URL = f"{GRAPH_API}/$batch"
+BATCH_MAX_REQUESTS = 20
+
+# Upper bound for --max-workers
+MAX_WORKERS = 16
+# Shared session for all Graph calls: keeps TCP/TLS connections alive across requests.
+# The pool has a connection for every list worker plus one for the main thread, which
+# keeps paging the lists collection and sending $batch requests meanwhile.
+HTTP_POOL_SIZE = MAX_WORKERS + 1
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Task fields read by main()/minimal_task_repr; everything else is left on the server
+TASK_SELECT_FIELDS = (
+    "title", "importance", "status", "body", "createdDateTime",
+    "dueDateTime", "completedDateTime", "reminderDateTime",
+)
+TASKS_PAGE_SIZE = 100
+
+# Flags for creating a note file; O_EXCL so an existing note (from an earlier run, or one
+# differing only in case on a case-insensitive filesystem) is never overwritten.
+# O_BINARY/O_CLOEXEC only exist on some platforms.
+_NOTE_OPEN_FLAGS = (os.O_WRONLY | os.O_CREAT | os.O_EXCL
+                    | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0))
+
+# Runs of characters that are replaced by a single "_" in task filenames
+_UNSAFE_FILENAME_RE = re.compile(r"[:/\\\s]+")
+# Characters stripped from list names to build the list folder name
+_LIST_NAME_RE = re.compile(r"[\s/]+")
+# Mapping keys that can be emitted as plain YAML scalars by _emit_frontmatter
+_YAML_PLAIN_KEY_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# Keys YAML 1.1 would read back as booleans/null instead of strings
+_YAML_RESERVED_KEYS = frozenset({"y", "n", "yes", "no", "on", "off", "true", "false", "null"})
+# Characters orjson leaves unescaped but YAML treats as line breaks or non-printable
+_YAML_UNSAFE_CHARS_RE = re.compile(r"[\x7f-\x9f\u2028\u2029\ufeff\ufffe\uffff\ud800-\udfff]")
+
+
+def _retry_delay(headers: Optional[Mapping[str, str]], attempt: int) -> float:
+    """Seconds to wait before the next attempt.
+
+    Honours a numeric `Retry-After` header when the server sends one, otherwise uses
+    capped exponential backoff with jitter so concurrent workers don't retry in lockstep.
+    """
+    if headers is not None:
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.strip().isdigit():
+            return float(retry_after)
+    return min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY) * (1 + random.random() * 0.5)
+
+
+def _send_with_retry(http: requests.Session, method: str, url: str, headers: Dict, timeout: float = 30,
+                     data: Optional[bytes] = None,
+                     parse_json: bool = False) -> Tuple[requests.Response, Optional[Dict]]:
+    """Send a request, retrying throttled/transient failures up to MAX_RETRIES times.
+
+    Returns `(response, None)`. With `parse_json` the body of a successful response is
+    streamed into orjson inside the retry loop (so a failed read is retried too) and
+    returned as the second item; the response is already closed by then.
+    """
+    attempt = 0
+    while True:
+        retry_headers: Optional[Mapping[str, str]] = None
+        try:
+            resp = http.request(method, url, headers=headers, timeout=timeout, data=data, stream=parse_json)
+            if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                retry_headers = resp.headers
+                resp.close()
+            elif not parse_json:
+                return resp, None
+            else:
+                try:
+                    return resp, (_read_json(resp) if resp.ok else None)
+                finally:
+                    # Return the connection to the pool before the caller processes the body
+                    resp.close()
+        except RETRY_EXCEPTIONS:
+            if attempt >= MAX_RETRIES:
+                raise
+        time.sleep(_retry_delay(retry_headers, attempt))
+        attempt += 1
+
+
+@mypyc_attr(native_class=False)  # mypyc can't compile subclasses of OSError-based exceptions
+class GraphAuthError(requests.exceptions.HTTPError):
+    """Graph rejected the bearer token (401/403); the message says why."""
+
+
+def _auth_error_message(status_code: int) -> Optional[str]:
+    """Helpful diagnostics for the common token failures (401/403), else None."""
+    if status_code == 401:
+        return "401 Unauthorized: token may be expired or invalid"
+    if status_code == 403:
+        return "403 Forbidden: token may be missing required scopes"
+    return None
+
+
+def _raise_for_graph_status(resp: requests.Response) -> None:
+    """Raise GraphAuthError for a rejected token, HTTPError for any other failure status."""
+    auth_error = _auth_error_message(resp.status_code)
+    if auth_error:
+        raise GraphAuthError(auth_error, response=resp)
+    resp.raise_for_status()
+
+
+def _read_json(resp: requests.Response) -> Dict:
+    """Parse a streamed response body with orjson.
+
+    The bytes go from urllib3 (gzip already decoded) straight into the parser, skipping
+    requests' cached `.content` copy and its charset detection. urllib3 read errors are
+    re-raised as the requests exceptions `resp.content` would have raised.
+    """
+    try:
+        raw = resp.raw.read(decode_content=True)
+    except ReadTimeoutError as e:
+        raise requests.ConnectionError(e, response=resp) from e
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e, response=resp) from e
+    except DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e, response=resp) from e
+    return orjson.loads(raw)
 
 
-def fetch_all(url: str, token: str) -> List[Dict]:
+def fetch_all(url: str, token: str, session: Optional[requests.Session] = None) -> Iterator[Dict]:
     """Fetch all pages of a Microsoft Graph collection starting at `url`.
 
-    Returns the concatenated list of items (the `.value` arrays).
+    Requests go through the module-level SESSION unless another `session` is passed.
+    Yields the items (the `.value` arrays) page by page, so only one page is held in
+    memory at a time; HTTP errors surface while iterating. A rejected token raises
+    GraphAuthError, so callers don't need a separate validation round-trip.
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
-    items: List[Dict] = []
+    http = session if session is not None else SESSION
+    headers = {"Authorization": f"Bearer {token}"}
     next_link: Optional[str] = url
     while next_link:
-        resp = requests.get(next_link, headers=headers)
-        resp.raise_for_status()
-        body = resp.json()
+        resp, body = _send_with_retry(http, "GET", next_link, headers, parse_json=True)
+        _raise_for_graph_status(resp)
+        body = body or {}
         value = body.get("value", [])
-        if isinstance(value, list):
-            items.extend(value)
         # nextLink may be absent or None
         next_link = body.get("@odata.nextLink")
-    return items
+        if isinstance(value, list):
+            yield from value
+
+
+def _batch_get(paths: List[str], headers: Dict, http: requests.Session) -> List[Union[Dict, requests.RequestException]]:
+    """GET up to BATCH_MAX_REQUESTS Graph `paths` with one $batch request.
+
+    Returns the response bodies in the order of `paths`. A failed sub-request is returned
+    as its HTTPError instead of raising, so one bad list doesn't fail the others; if the
+    batch itself fails, its error is returned for every path.
+    Throttled sub-requests are re-sent in a new batch after the longest Retry-After.
+    """
+    # Every slot is overwritten below: with a response body or with an error
+    results: List[Union[Dict, requests.RequestException]] = [{}] * len(paths)
+    pending = {str(i): path for i, path in enumerate(paths)}
+    attempt = 0
+    while pending:
+        payload = {"requests": [{"id": i, "method": "GET", "url": path} for i, path in pending.items()]}
+        body: Optional[Dict] = None
+        failure: Optional[requests.RequestException] = None
+        try:
+            resp, body = _send_with_retry(http, "POST", BATCH_URL, headers, data=orjson.dumps(payload),
+                                          parse_json=True)
+            _raise_for_graph_status(resp)
+        except requests.RequestException as e:
+            # Network failures that outlasted the retries, or a failed batch status
+            failure = e
+        if failure is not None:
+            for i in pending:
+                results[int(i)] = failure
+            break
+        responses = (body or {}).get("responses", [])
+
+        retry_headers: List[Mapping[str, str]] = []
+        for sub in responses:
+            sub_id = str(sub.get("id"))
+            if sub_id not in pending:
+                continue
+            status = sub.get("status", 0)
+            if status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                retry_headers.append(CaseInsensitiveDict(sub.get("headers") or {}))
+                continue
+            path = pending.pop(sub_id)
+            if 200 <= status < 300:
+                results[int(sub_id)] = sub.get("body") or {}
+                continue
+            auth_error = _auth_error_message(status)
+            if auth_error:
+                results[int(sub_id)] = GraphAuthError(auth_error)
+            else:
+                error = (sub.get("body") or {}).get("error") or {}
+                results[int(sub_id)] = requests.HTTPError(
+                    f"{status} Error: {error.get('message') or error.get('code') or 'batched request failed'}"
+                    f" for path: {path}")
+
+        if pending and attempt >= MAX_RETRIES:
+            for i, path in pending.items():
+                results[int(i)] = requests.HTTPError(f"No batch response for path: {path}")
+            break
+        if pending:
+            delays = [_retry_delay(h, attempt) for h in retry_headers] or [_retry_delay(None, attempt)]
+            time.sleep(max(delays))
+            attempt += 1
+    return results
+
+
+def _iter_batched_pages(first: Union[Dict, requests.RequestException], token: str,
+                        session: Optional[requests.Session]) -> Iterator[Dict]:
+    if isinstance(first, requests.RequestException):
+        raise first
+    value = first.get("value", [])
+    if isinstance(value, list):
+        yield from value
+    next_link = first.get("@odata.nextLink")
+    if next_link:
+        yield from fetch_all(next_link, token, session)
+
+
+def fetch_all_batched(paths: List[str], token: str,
+                      session: Optional[requests.Session] = None) -> List[Iterator[Dict]]:
+    """Like `fetch_all` for several collections, with their first pages fetched via $batch.
+
+    `paths` are relative to the Graph version root (e.g. "/me/todo/lists/{id}/tasks").
+    Returns one item iterator per path; the first pages arrive together in batches of
+    BATCH_MAX_REQUESTS, later pages are fetched lazily while iterating. Errors for a
+    collection are raised when its iterator is consumed.
+    """
+    http = session if session is not None else SESSION
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    first_pages: List[Union[Dict, requests.RequestException]] = []
+    for start in range(0, len(paths), BATCH_MAX_REQUESTS):
+        first_pages.extend(_batch_get(paths[start:start + BATCH_MAX_REQUESTS], headers, http))
+    return [_iter_batched_pages(first, token, session) for first in first_pages]
 
 
-def validate_token(token: str) -> tuple[bool, Optional[str]]:
+def validate_token(token: str, session: Optional[requests.Session] = None) -> tuple[bool, Optional[str]]:
     """Quickly validate a Microsoft Graph bearer token by calling /me.
 
     Returns (True, None) on success. On failure returns (False, message) where message
@@ -54,18 +300,18 @@ def validate_token(token: str) -> tuple[bool, Optional[str]]:
     """
     if not token:
         return False, "no token provided"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    headers = {"Authorization": f"Bearer {token}"}
+    http = session if session is not None else SESSION
     try:
-        resp = requests.get("https://graph.microsoft.com/v1.0/me", headers=headers, timeout=10)
+        resp, _ = _send_with_retry(http, "GET", f"{GRAPH_API}/me", headers, timeout=10)
     except requests.RequestException as e:
         return False, f"request error: {e}"
     if resp.status_code == 200:
         return True, None
     # Provide helpful diagnostics for common cases (401/403)
-    if resp.status_code == 401:
-        return False, "401 Unauthorized: token may be expired or invalid"
-    if resp.status_code == 403:
-        return False, "403 Forbidden: token may be missing required scopes"
+    auth_error = _auth_error_message(resp.status_code)
+    if auth_error:
+        return False, auth_error
     return False, f"{resp.status_code} {resp.reason}"
 
 
@@ -73,99 +319,194 @@ def safe_filename(title: str) -> str:
     # First replace each ? with _ (including at start/end of filename)
     s = title.replace("?", "_")
     # Then handle other special characters
-    s = re.sub(r"[:/\\\s]+", "_", s)
+    s = _UNSAFE_FILENAME_RE.sub("_", s)
     if not s:
         s = "untitled"
     # Ensure filename is not too long
     return s[:150]
 
 
-def write_task_file(folder: str, filename_base: str, task_json: Dict) -> str:
-    os.makedirs(folder, exist_ok=True)
-    filename = f"{filename_base}.md"
-    path = os.path.join(folder, filename)
-    # Avoid overwriting if duplicate title exists: append a counter
-    counter = 1
-    base = filename_base
-    while os.path.exists(path):
-        filename = f"{base}_{counter}.md"
-        path = os.path.join(folder, filename)
-        counter += 1
-    # original_task is optional; if provided, we'll render checklist items below the note
-    with open(path, "w", encoding="utf-8") as f:
-        # Write Obsidian-compatible YAML frontmatter (properties)
-        # Use PyYAML to emit a readable YAML block; keep keys order for readability
-        # Exclude any internal checklist items from the frontmatter properties
-        frontmatter_data = None
+def tasks_path(list_id: str, skip_completed: bool = False) -> str:
+    """Build the Graph path (relative to GRAPH_API) for a list's tasks.
+
+    Only the fields the export uses are selected and checklist items are expanded inline;
+    with `skip_completed` the server filters out completed tasks before sending them.
+    """
+    params = {
+        "$select": ",".join(TASK_SELECT_FIELDS),
+        "$expand": "checklistItems",
+        "$top": TASKS_PAGE_SIZE,
+    }
+    if skip_completed:
+        params["$filter"] = "status ne 'completed'"
+    query = urlencode(params, quote_via=quote, safe="$,'")
+    return f"/me/todo/lists/{list_id}/tasks?{query}"
+
+
+def name_key(name: str) -> str:
+    """Key under which file/folder names are compared, so names that differ only in case
+    are treated as the same file (as on macOS and Windows filesystems)."""
+    return os.path.normcase(name).casefold()
+
+
+def unique_basename(used_names: Dict[str, int], base: str) -> str:
+    """Return `base`, or `base_<n>` if that name was already handed out for the folder.
+
+    `used_names` maps the `name_key` of each base name to the next counter to try and is
+    kept by the caller per output folder, so duplicate titles are resolved without
+    probing the filesystem. Calling it again with the same `base` yields the next name.
+    """
+    key = name_key(base)
+    count = used_names.get(key, 0)
+    name = base if count == 0 else f"{base}_{count}"
+    # A literal title such as "foo_1" may already have claimed the counter-suffixed name
+    while count and name_key(name) in used_names:
+        count += 1
+        name = f"{base}_{count}"
+    used_names[key] = count + 1
+    used_names.setdefault(name_key(name), 1)
+    return name
+
+
+def _emit_yaml_key(key: object) -> bytes:
+    if (not isinstance(key, str) or not _YAML_PLAIN_KEY_RE.fullmatch(key)
+            or key.lower() in _YAML_RESERVED_KEYS):
+        raise ValueError(f"unsupported frontmatter key: {key!r}")
+    return key.encode("ascii")
+
+
+def _emit_yaml_scalar(value: object) -> bytes:
+    if value is None:
+        return b"null"
+    if value is True:
+        return b"true"
+    if value is False:
+        return b"false"
+    if isinstance(value, str):
+        if _YAML_UNSAFE_CHARS_RE.search(value):
+            raise ValueError("string needs YAML-specific escaping")
+        # A JSON string is also a valid double-quoted YAML scalar
+        return orjson.dumps(value)
+    if isinstance(value, int):
+        return str(value).encode("ascii")
+    raise ValueError(f"unsupported frontmatter value: {type(value).__name__}")
+
+
+def _emit_frontmatter(data: Dict) -> bytes:
+    """Emit the YAML frontmatter for a `minimal_task_repr` payload without PyYAML.
+
+    Handles the flat task schema: scalars plus one level of nested dicts (`body`,
+    `dueDateTime`, ...). Raises ValueError for any other shape so the caller can fall
+    back to a full YAML dumper.
+    """
+    out = bytearray()
+    for key, value in data.items():
+        out += _emit_yaml_key(key)
+        if isinstance(value, dict):
+            if not value:
+                out += b": {}\n"
+                continue
+            out += b":\n"
+            for sub_key, sub_value in value.items():
+                out += b"  " + _emit_yaml_key(sub_key) + b": " + _emit_yaml_scalar(sub_value) + b"\n"
+        else:
+            out += b": " + _emit_yaml_scalar(value) + b"\n"
+    return bytes(out)
+
+
+def _escape_table_cell(s: str) -> str:
+    return (s or "").replace("|", "\\|")
+
+
+def write_task_file(folder: str, filename_base: str, task_json: Dict,
+                    checklist_items: Optional[List[Dict]] = None,
+                    include_raw_json: bool = False) -> str:
+    """Write a task note to `folder/<filename_base>.md` and return its path.
+
+    The folder must already exist and `filename_base` should be unique within it (see
+    `unique_basename`); if the file exists anyway, FileExistsError is raised and nothing
+    is overwritten. `checklist_items` are rendered as a subtasks table below
+    the frontmatter rather than as properties. With `include_raw_json`, a task without
+    body content gets its properties appended as a fenced JSON block.
+    """
+    # `filename_base` is already sanitized, so plain concatenation is enough here
+    path = f"{folder}{os.sep}{filename_base}.md"
+    # Assemble the whole note as UTF-8 bytes and write it in one go; orjson already emits
+    # bytes, so this avoids a bytes -> str -> bytes round trip through a text-mode file.
+    buf = bytearray()
+
+    # JSON rendering of the task, serialized at most once and shared by the fallbacks below
+    json_bytes: Optional[bytes] = None
+
+    # Write Obsidian-compatible YAML frontmatter (properties); keep keys order for readability.
+    # The known task schema is emitted directly; anything else goes through PyYAML.
+    try:
+        yaml_bytes = _emit_frontmatter(task_json)
+    except ValueError:
         try:
-            frontmatter_data = dict(task_json) if isinstance(task_json, dict) else task_json
-            if isinstance(frontmatter_data, dict):
-                frontmatter_data.pop("_checklistItems", None)
-            yaml_str = yaml.safe_dump(frontmatter_data, allow_unicode=True, sort_keys=False)
+            yaml_bytes = yaml.dump(task_json, Dumper=_YAML_DUMPER, allow_unicode=True, sort_keys=False).encode("utf-8")
         except Exception:
             # Fallback: use a JSON dump inside the frontmatter if YAML serialization fails
-            # Ensure checklist items are excluded from the fallback as well
-            fm = dict(task_json) if isinstance(task_json, dict) else task_json
-            if isinstance(fm, dict):
-                fm.pop("_checklistItems", None)
-            yaml_str = json.dumps(fm, ensure_ascii=False, indent=2)
-
-        f.write("---\n")
-        f.write(yaml_str)
-        f.write("---\n\n")
-
-        # Render checklist items (if any) as a Markdown table under a "## Subtasks" heading.
-        # Only use `isChecked` and `displayName` fields.
-        original_items = None
-        # The caller may embed original checklist items into a special key; check for that first
-        if isinstance(task_json, dict):
-            original_items = task_json.get("_checklistItems")
-        # If not present, see if the calling code passed a separate list via a local variable
-        if not original_items:
-            # No checklist items to render
-            original_items = None
-
-        if original_items and isinstance(original_items, list) and len(original_items) > 0:
-            def esc(s: str) -> str:
-                return (s or "").replace("|", "\\|")
-
-            f.write("\n## Subtasks\n\n")
-            f.write("| Status | Item |\n")
-            f.write("| --- | --- |\n")
-            for it in original_items:
-                checked = it.get("isChecked")
-                # Convert boolean to "done" or "to do"
-                checked_str = "done" if checked else "to do"
-                display = esc(it.get("displayName") or "")
-                f.write(f"| {checked_str} | {display} |\n")
-            f.write("\n")  # Add blank line after table
-
-        # If the task has a body content (common in MS To Do), append it as the note
-        body = None
-        if isinstance(task_json, dict):
-            b = task_json.get("body")
-            if isinstance(b, dict):
-                body = b.get("content")
-
-        if body:
-            # Write the body content as markdown
-            f.write(str(body))
-            if not str(body).endswith("\n"):
-                f.write("\n")
-        else:
-            # Otherwise include the full JSON for reference in a fenced code block
-            f.write("```json\n")
-            json.dump(task_json, f, ensure_ascii=False, indent=2)
-            f.write("\n```\n")
+            json_bytes = orjson.dumps(task_json, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            yaml_bytes = json_bytes + b"\n"
+
+    buf += b"---\n"
+    buf += yaml_bytes
+    buf += b"---\n\n"
+
+    # Render checklist items (if any) as a Markdown table under a "## Subtasks" heading.
+    # Only use `isChecked` and `displayName` fields.
+    original_items = checklist_items
+
+    if original_items and isinstance(original_items, list) and len(original_items) > 0:
+        buf += b"\n## Subtasks\n\n| Status | Item |\n| --- | --- |\n"
+        # Convert `isChecked` to "done" or "to do"; encode all rows in one pass
+        buf += "".join(
+            f"| {'done' if it.get('isChecked') else 'to do'} | {_escape_table_cell(it.get('displayName') or '')} |\n"
+            for it in original_items
+        ).encode("utf-8")
+        buf += b"\n"  # Add blank line after table
+
+    # If the task has a body content (common in MS To Do), append it as the note
+    body = None
+    if isinstance(task_json, dict):
+        b = task_json.get("body")
+        if isinstance(b, dict):
+            body = b.get("content")
+
+    if body:
+        # Write the body content as markdown
+        body_str = str(body)
+        buf += body_str.encode("utf-8")
+        if not body_str.endswith("\n"):
+            buf += b"\n"
+    elif include_raw_json:
+        # Otherwise include the full JSON for reference in a fenced code block
+        if json_bytes is None:
+            json_bytes = orjson.dumps(task_json, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        buf += b"```json\n"
+        buf += json_bytes
+        buf += b"\n```\n"
+
+    # Hand the finished note to the kernel directly instead of going through buffered IO:
+    # one write() per note, however large, rather than one per 8 KiB buffer flush
+    fd = os.open(path, _NOTE_OPEN_FLAGS, 0o644)
+    try:
+        view = memoryview(buf)
+        written = 0
+        while written < len(view):
+            written += os.write(fd, view[written:])
+    finally:
+        os.close(fd)
     return path
 
 
 def minimal_task_repr(task: Dict) -> Dict:
-    importance = (task.get("importance") or "").lower()
+    # Graph returns importance lowercased ("low", "normal", "high")
     return {
         "title": task.get("title"),
         # "importance": task.get("importance"), Removed as it got migrated in "is_starred"
-        "is_starred": True if importance == "high" else False,
+        "is_starred": task.get("importance") == "high",
         # "status": task.get("status"), Do NOT include status as it always returns "notStarted"
         # "categories": task.get("categories"), Do NOT include status as it's array is always empty
         "createdDateTime": task.get("createdDateTime"),
@@ -186,6 +527,10 @@ def main(argv: Optional[List[str]] = None) -> int:
     p.add_argument("--source-base", help="Source lists base URL",
                    default="https://graph.microsoft.com/v1.0/me/todo/lists")
     p.add_argument("--validate-token", help="Validate source token and exit (no migration)", action="store_true")
+    p.add_argument("--include-raw-json-fallback", action="store_true",
+                   help="For tasks without body content, append the task properties as a fenced JSON block")
+    p.add_argument("--max-workers", help="Number of lists whose tasks are fetched concurrently "
+                   f"(at most {MAX_WORKERS})", type=int, default=8)
     args = p.parse_args(argv)
 
     source_token = args.source_token
@@ -202,55 +547,110 @@ def main(argv: Optional[List[str]] = None) -> int:
             print("Token validation failed:", msg, file=sys.stderr)
             return 3
 
-    # Early validation to give a clearer error message if token is invalid/expired.
-    ok, msg = validate_token(source_token)
-    if not ok:
-        print("Failed to validate source token:", msg, file=sys.stderr)
-        print("If your token is a short-lived OAuth token it may have expired. Obtain a new bearer token and retry.")
+    # No /me preflight: an invalid/expired token is reported by the lists request itself.
+    if not source_token:
+        print("Failed to validate source token: no token provided", file=sys.stderr)
         return 3
 
-    print("Fetching source lists...")
-    try:
-        source_lists = fetch_all(args.source_base, source_token)
-    except requests.HTTPError as e:
-        print("Failed to fetch source lists:", e, file=sys.stderr)
-        return 2
+    # Filenames handed out so far, per output folder (keyed by name_key: two lists may clean
+    # to the same folder, or to folders that differ only in case)
+    used_names: Dict[str, Dict[str, int]] = {}
+    # Guards used_names and keeps lines printed by concurrent workers from interleaving
+    lock = threading.Lock()
 
-    total_migrated = 0
-    for source in source_lists:
-        display_name = source.get("displayName", "untitled_list")
-        list_id = source.get("id")
-        wellknown = source.get("wellknownListName")
-        print(f"Processing list: {display_name} (id={list_id}) wellknown={wellknown}")
+    def export_list(display_name: str, list_folder: str, tasks: Iterable[Dict]) -> int:
+        """Stream the tasks of one list to disk as their pages arrive; returns the count written."""
+        found_count = 0
+        migrated_count = 0
+        try:
+            for task in tasks:
+                found_count += 1
+                # Normally a no-op: with --skip-completed the server already filters these out
+                if skip_completed and task.get("status") == "completed":
+                    continue
+                title = task.get("title") or "untitled"
+                if migrated_count == 0:
+                    # Once per list, and only for lists that end up with notes
+                    os.makedirs(list_folder, exist_ok=True)
+                base = safe_filename(title)
+                payload = minimal_task_repr(task)
+                path: Optional[str] = None
+                while path is None:
+                    with lock:
+                        filename_base = unique_basename(used_names.setdefault(name_key(list_folder), {}), base)
+                    try:
+                        # Checklist items are passed separately so they are NOT included in frontmatter
+                        path = write_task_file(list_folder, filename_base, payload, task.get("checklistItems"),
+                                               args.include_raw_json_fallback)
+                    except FileExistsError:
+                        # Left over from an earlier run or a case-variant name: try the next suffix
+                        pass
+                migrated_count += 1
+                with lock:
+                    print(f"Wrote task '{title}' -> {path}")
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
+            # HTTP errors, network failures that outlasted the retries or an unreadable page:
+            # report them for this list and keep the notes written so far
+            with lock:
+                print(f"Failed to fetch tasks for {display_name}: {e}", file=sys.stderr)
+
+        with lock:
+            print(f"Found {found_count} tasks in {display_name}")
+            print(f"Migrated {migrated_count} tasks from {display_name}")
+        return migrated_count
 
-        cleaned = re.sub(r"[\s/]+", "", display_name)
-        list_folder = os.path.join(output_folder, cleaned)
+    print("Fetching source lists...")
+    total_migrated = 0
+    # Export several lists concurrently; each worker writes its list's tasks while paging.
+    # The first task page of up to BATCH_MAX_REQUESTS lists is fetched in one $batch call,
+    # and lists are submitted as they arrive, so exports start before all lists are known.
+    with ThreadPoolExecutor(max_workers=min(max(1, args.max_workers), MAX_WORKERS)) as executor:
+        futures = []
+        pending_lists: List[Tuple[str, str, str]] = []
+
+        def submit_pending() -> None:
+            paths = [path for _, _, path in pending_lists]
+            for (display_name, list_folder, _), tasks in zip(pending_lists, fetch_all_batched(paths, source_token)):
+                futures.append(executor.submit(export_list, display_name, list_folder, tasks))
+            pending_lists.clear()
 
-        # fetch tasks for the list
-        tasks_url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks"
         try:
-            tasks = fetch_all(tasks_url, source_token)
+            for source in fetch_all(args.source_base, source_token):
+                display_name = source.get("displayName", "untitled_list")
+                list_id = source.get("id")
+                wellknown = source.get("wellknownListName")
+                with lock:
+                    print(f"Processing list: {display_name} (id={list_id}) wellknown={wellknown}")
+
+                cleaned = _LIST_NAME_RE.sub("", display_name)
+                list_folder = os.path.join(output_folder, cleaned)
+
+                # fetch tasks for the list
+                pending_lists.append((display_name, list_folder, tasks_path(str(list_id), skip_completed)))
+                if len(pending_lists) == BATCH_MAX_REQUESTS:
+                    submit_pending()
+            submit_pending()
         except requests.HTTPError as e:
-            print(f"Failed to fetch tasks for {display_name}: {e}", file=sys.stderr)
-            continue
+            for future in futures:
+                future.cancel()
+            with lock:
+                if isinstance(e, GraphAuthError):
+                    print("Failed to validate source token:", e, file=sys.stderr)
+                    print("If your token is a short-lived OAuth token it may have expired. "
+                          "Obtain a new bearer token and retry.")
+                    return 3
+                print("Failed to fetch source lists:", e, file=sys.stderr)
+            return 2
+        except requests.RequestException as e:
+            # DNS/connection/timeout failures that outlasted the retries
+            for future in futures:
+                future.cancel()
+            with lock:
+                print("Failed to validate source token:", f"request error: {e}", file=sys.stderr)
+            return 3
 
-        print(f"Found {len(tasks)} tasks in {display_name}")
-        migrated_count = 0
-        for task in tasks:
-            status = task.get("status")
-            title = task.get("title") or "untitled"
-            if skip_completed and status == "completed":
-                continue
-            filename_base = safe_filename(title)
-            payload = minimal_task_repr(task)
-            # Attach checklist items under an internal key so they are NOT included in frontmatter
-            payload["_checklistItems"] = task.get("checklistItems")
-            path = write_task_file(list_folder, filename_base, payload)
-            migrated_count += 1
-            print(f"Wrote task '{title}' -> {path}")
-
-        print(f"Migrated {migrated_count} tasks from {display_name}")
-        total_migrated += migrated_count
+        for future in as_completed(futures):
+            total_migrated += future.result()
 
     print(f"Migration completed! Total migrated: {total_migrated}")
     return 0
@@ -0,0 +1,296 @@
+import contextlib
+import http.client
+import io
+import os
+import tempfile
+import unittest
+from typing import Dict, List, Optional, Tuple, Union
+from unittest import mock
+
+import orjson
+import requests
+import yaml
+from urllib3.response import HTTPResponse
+
+import ms_todo_migrate as m
+
+
+def _response(status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """A requests.Response whose body is streamed from a urllib3 response, like the real one."""
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    resp.raw = HTTPResponse(body=io.BytesIO(orjson.dumps(body)), status=status, preload_content=False)
+    return resp
+
+
+Reply = Union[Dict, requests.Response, Exception]
+
+
+def _answer(reply: Reply) -> requests.Response:
+    if isinstance(reply, Exception):
+        raise reply
+    if isinstance(reply, requests.Response):
+        return reply
+    return _response(200, reply)
+
+
+class FakeSession:
+    """Answers GETs from `pages` and $batch POSTs from the queued `batches` replies.
+
+    A reply is a 200 body, a ready response or an exception to raise; a list in `pages`
+    answers successive requests for that URL.
+    """
+
+    def __init__(self, pages: Optional[Dict[str, Union[Reply, List[Reply]]]] = None,
+                 batches: Optional[List[Reply]] = None):
+        self.pages = pages or {}
+        self.batches = batches or []
+        self.calls: List[Tuple[str, str, Optional[Dict]]] = []
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, timeout: Optional[float] = None,
+                data: Optional[bytes] = None, stream: bool = False) -> requests.Response:
+        self.calls.append((method, url, orjson.loads(data) if data else None))
+        if method == "POST" and url == m.BATCH_URL:
+            return _answer(self.batches.pop(0))
+        if url in self.pages:
+            page = self.pages[url]
+            return _answer(page.pop(0) if isinstance(page, list) else page)
+        return _response(404, {"error": {"code": "NotFound"}})
+
+
+def _sub(sub_id: str, status: int, body: Optional[Dict] = None, headers: Optional[Dict] = None) -> Dict:
+    return {"id": sub_id, "status": status, "body": body or {}, "headers": headers or {}}
+
+
+class _TruncatedBody(io.BytesIO):
+    def read(self, *args: object) -> bytes:
+        raise http.client.IncompleteRead(b"{")
+
+
+def _truncated_response() -> requests.Response:
+    """A 200 response whose connection drops while the body is read."""
+    resp = _response(200, {})
+    resp.raw = HTTPResponse(body=_TruncatedBody(), status=200, preload_content=False)
+    return resp
+
+
+class SendWithRetryTest(unittest.TestCase):
+    url = "https://graph.test/tasks"
+
+    def send(self, session: FakeSession) -> Tuple[requests.Response, Optional[Dict], List[float]]:
+        with mock.patch("ms_todo_migrate.time.sleep") as sleep:
+            resp, body = m._send_with_retry(session, "GET", self.url, {}, parse_json=True)  # type: ignore[arg-type]
+        return resp, body, [call.args[0] for call in sleep.call_args_list]
+
+    def test_retry_after_is_honoured(self):
+        session = FakeSession(pages={self.url: [_response(429, {}, {"Retry-After": "7"}), {"value": [1]}]})
+        resp, body, delays = self.send(session)
+        self.assertEqual((resp.status_code, body, delays), (200, {"value": [1]}, [7.0]))
+
+    def test_server_error_backs_off(self):
+        session = FakeSession(pages={self.url: [_response(503, {}), _response(503, {}), {"value": []}]})
+        resp, body, delays = self.send(session)
+        self.assertEqual((resp.status_code, body), (200, {"value": []}))
+        # Exponential backoff with up to 50% jitter
+        self.assertTrue(m.RETRY_BASE_DELAY <= delays[0] <= 1.5 * m.RETRY_BASE_DELAY)
+        self.assertTrue(2 * m.RETRY_BASE_DELAY <= delays[1] <= 3 * m.RETRY_BASE_DELAY)
+
+    def test_gives_up_after_max_retries(self):
+        session = FakeSession(pages={self.url: [_response(503, {}) for _ in range(m.MAX_RETRIES + 1)]})
+        resp, body, delays = self.send(session)
+        self.assertEqual((resp.status_code, body, len(delays)), (503, None, m.MAX_RETRIES))
+        with self.assertRaises(requests.HTTPError):
+            m._raise_for_graph_status(resp)
+
+    def test_network_error_is_raised_after_max_retries(self):
+        session = FakeSession(pages={self.url: requests.ConnectionError("down")})
+        with self.assertRaises(requests.ConnectionError):
+            self.send(session)
+        self.assertEqual(len(session.calls), m.MAX_RETRIES + 1)
+
+    def test_truncated_body_is_retried(self):
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            m._read_json(_truncated_response())
+        session = FakeSession(pages={self.url: [_truncated_response(), {"value": [1]}]})
+        _, body, delays = self.send(session)
+        self.assertEqual((body, len(delays)), ({"value": [1]}, 1))
+
+
+@mock.patch("ms_todo_migrate.time.sleep", lambda _: None)
+class FetchAllBatchedTest(unittest.TestCase):
+
+    def test_throttled_sub_request_is_resent(self):
+        session = FakeSession(batches=[
+            {"responses": [_sub("0", 200, {"value": [{"id": "a"}]}),
+                           _sub("1", 429, headers={"Retry-After": "1"})]},
+            {"responses": [_sub("1", 200, {"value": [{"id": "b"}]})]},
+        ])
+        lists = m.fetch_all_batched(["/l/0", "/l/1"], "token", session)  # type: ignore[arg-type]
+        self.assertEqual([list(tasks) for tasks in lists], [[{"id": "a"}], [{"id": "b"}]])
+        # Only the throttled sub-request goes into the second batch
+        self.assertEqual([r["url"] for r in session.calls[1][2]["requests"]], ["/l/1"])
+
+    def test_failed_sub_request_raises_from_its_iterator(self):
+        session = FakeSession(batches=[
+            {"responses": [_sub("0", 404, {"error": {"message": "list is gone"}}),
+                           _sub("1", 200, {"value": [{"id": "b"}]})]},
+        ])
+        gone, ok = m.fetch_all_batched(["/l/0", "/l/1"], "token", session)  # type: ignore[arg-type]
+        self.assertEqual(list(ok), [{"id": "b"}])
+        with self.assertRaisesRegex(requests.HTTPError, "404 Error: list is gone for path: /l/0"):
+            list(gone)
+
+    def test_failed_batch_request_raises_from_every_iterator(self):
+        session = FakeSession(batches=[requests.ConnectionError("batch down")] * (m.MAX_RETRIES + 1))
+        lists = m.fetch_all_batched(["/l/0", "/l/1"], "token", session)  # type: ignore[arg-type]
+        self.assertEqual(len(session.calls), m.MAX_RETRIES + 1)
+        for tasks in lists:
+            with self.assertRaisesRegex(requests.ConnectionError, "batch down"):
+                list(tasks)
+
+    def test_next_link_is_followed_outside_the_batch(self):
+        next_link = f"{m.GRAPH_API}/l/0?$skiptoken=x"
+        session = FakeSession(
+            pages={next_link: {"value": [{"id": "b"}]}},
+            batches=[{"responses": [_sub("0", 200, {"value": [{"id": "a"}], "@odata.nextLink": next_link})]}],
+        )
+        (tasks,) = m.fetch_all_batched(["/l/0"], "token", session)  # type: ignore[arg-type]
+        self.assertEqual(list(tasks), [{"id": "a"}, {"id": "b"}])
+        self.assertEqual([(method, url) for method, url, _ in session.calls],
+                         [("POST", m.BATCH_URL), ("GET", next_link)])
+
+
+class UniqueBasenameTest(unittest.TestCase):
+
+    def test_duplicates_get_a_counter(self):
+        used: Dict[str, int] = {}
+        self.assertEqual([m.unique_basename(used, "foo") for _ in range(3)], ["foo", "foo_1", "foo_2"])
+
+    def test_names_differing_only_in_case_collide(self):
+        used: Dict[str, int] = {}
+        self.assertEqual(m.unique_basename(used, "Foo"), "Foo")
+        self.assertEqual(m.unique_basename(used, "foo"), "foo_1")
+        self.assertEqual(m.unique_basename(used, "FOO"), "FOO_2")
+
+    def test_literal_suffixed_title_is_not_reused(self):
+        used: Dict[str, int] = {}
+        self.assertEqual(m.unique_basename(used, "foo_1"), "foo_1")
+        self.assertEqual(m.unique_basename(used, "foo"), "foo")
+        self.assertEqual(m.unique_basename(used, "foo"), "foo_2")
+        self.assertEqual(m.unique_basename(used, "foo_1"), "foo_1_1")
+
+
+class EmitFrontmatterTest(unittest.TestCase):
+
+    def test_round_trips_through_yaml(self):
+        data = {
+            "id": "AAMk=",
+            "title": 'Say "hi": #1 - yes, no ~ null 😀',
+            "status": "notStarted",
+            "isReminderOn": False,
+            "importance": None,
+            "count": 3,
+            "body": {"content": "line 1\nline 2\ttab", "contentType": "text"},
+            "dueDateTime": {"dateTime": "2024-01-01T00:00:00.0000000", "timeZone": "UTC"},
+            "categories": {},
+        }
+        self.assertEqual(yaml.safe_load(m._emit_frontmatter(data)), data)
+
+    def test_unsupported_shapes_raise(self):
+        for data in ({"categories": ["a"]}, {"body": {"nested": {"a": 1}}}, {"yes": "x"},
+                     {"bad key": "x"}, {"score": 1.5}, {"title": "nel\x85"}):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                m._emit_frontmatter(data)
+
+
+@mock.patch("ms_todo_migrate.time.sleep", lambda _: None)
+class MainTest(unittest.TestCase):
+    lists_url = "https://graph.test/lists"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = tmp.name
+
+    def run_main(self, session: FakeSession) -> Tuple[int, str, str]:
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch.object(m, "SESSION", session), contextlib.redirect_stdout(out), \
+                contextlib.redirect_stderr(err):
+            rc = m.main(["--source-token", "token", "--source-base", self.lists_url,
+                         "--output-folder", self.folder])
+        return rc, out.getvalue(), err.getvalue()
+
+    def test_network_failure_while_paging_a_list_is_reported_for_that_list(self):
+        next_link = f"{m.GRAPH_API}/l2?$skiptoken=x"
+        session = FakeSession(
+            pages={self.lists_url: {"value": [{"id": "1", "displayName": "L1"}, {"id": "2", "displayName": "L2"}]},
+                   next_link: requests.ConnectionError("boom")},
+            batches=[{"responses": [_sub("0", 200, {"value": [{"title": "a"}]}),
+                                    _sub("1", 200, {"value": [{"title": "b"}], "@odata.nextLink": next_link})]}],
+        )
+        rc, out, err = self.run_main(session)
+        self.assertEqual(rc, 0)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.folder, "L2"))), ["b.md"])
+        self.assertIn("Failed to fetch tasks for L2: boom", err)
+        self.assertIn("Migrated 1 tasks from L2", out)
+        self.assertIn("Total migrated: 2", out)
+
+    def test_rerun_adds_suffixed_notes_instead_of_overwriting(self):
+        list_folder = os.path.join(self.folder, "L1")
+        os.makedirs(list_folder)
+        with open(os.path.join(list_folder, "a.md"), "w") as f:
+            f.write("from an earlier run\n")
+        session = FakeSession(
+            pages={self.lists_url: {"value": [{"id": "1", "displayName": "L1"}]}},
+            batches=[{"responses": [_sub("0", 200, {"value": [{"title": "a"}, {"title": "a"}]})]}],
+        )
+        rc, out, _ = self.run_main(session)
+        self.assertEqual(rc, 0)
+        self.assertEqual(sorted(os.listdir(list_folder)), ["a.md", "a_1.md", "a_2.md"])
+        with open(os.path.join(list_folder, "a.md")) as f:
+            self.assertEqual(f.read(), "from an earlier run\n")
+        self.assertIn("Total migrated: 2", out)
+
+
+class WriteTaskFileTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = tmp.name
+
+    def write(self, task: Dict, checklist_items: Optional[List[Dict]] = None, include_raw_json: bool = False,
+              filename_base: str = "note") -> bytes:
+        path = m.write_task_file(self.folder, filename_base, task, checklist_items, include_raw_json)
+        self.assertEqual(path, os.path.join(self.folder, f"{filename_base}.md"))
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_note_with_body_and_subtasks(self):
+        task = {"title": "Buy milk", "is_starred": True, "body": {"content": "2 litres", "contentType": "text"}}
+        items = [{"displayName": "a | b", "isChecked": True}, {"isChecked": False}]
+        self.assertEqual(self.write(task, items, include_raw_json=True), (
+            b'---\ntitle: "Buy milk"\nis_starred: true\nbody:\n  content: "2 litres"\n  contentType: "text"\n---\n\n'
+            b"\n## Subtasks\n\n| Status | Item |\n| --- | --- |\n| done | a \\| b |\n| to do |  |\n\n"
+            b"2 litres\n"))
+
+    def test_note_without_body(self):
+        self.assertEqual(self.write({"title": "x", "body": None}), b'---\ntitle: "x"\nbody: null\n---\n\n')
+
+    def test_note_without_body_with_raw_json_fallback(self):
+        self.assertEqual(self.write({"title": "x", "body": None}, include_raw_json=True), (
+            b'---\ntitle: "x"\nbody: null\n---\n\n'
+            b'```json\n{\n  "title": "x",\n  "body": null\n}\n```\n'))
+
+    def test_existing_note_is_not_overwritten(self):
+        self.write({"title": "first"})
+        with self.assertRaises(FileExistsError):
+            self.write({"title": "second"})
+        self.assertEqual(self.write({"title": "second"}, filename_base="note_1"),
+                         b'---\ntitle: "second"\n---\n\n')
+        with open(os.path.join(self.folder, "note.md"), "rb") as f:
+            self.assertEqual(f.read(), b'---\ntitle: "first"\n---\n\n')
+
+if __name__ == "__main__":
+    unittest.main()